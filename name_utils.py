@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+Lógica de formatação de nomes e leitura de planilhas, partilhada pela interface
+Streamlit em `app.py`. Manter este módulo livre de chamadas ao Streamlit para
+que possa ser importado e testado isoladamente.
+"""
+import pandas as pd
+import openpyxl
+import functools
+import itertools
+import re
+import string
+from datetime import datetime
+
+# Padrões compilados uma única vez no arranque; evita a re-consulta da cache
+# interna do módulo re em cada chamada dentro dos caminhos quentes.
+# Colapsa sequências de '_' ou de '-' numa só passagem; a backreference garante
+# que apenas repetições do mesmo separador são colapsadas.
+_RE_DUP_SEP = re.compile(r'([_-])\1+')
+_RE_NONALNUM = re.compile(r'[^a-z0-9]')
+_RE_LETRA_UNIDADE = re.compile(r'^[a-zA-Z]:[\\/]')
+
+# Tabela de remoção dos caracteres proibidos em nomes de pasta no Windows;
+# apagar uma classe fixa de caracteres é o caso em que str.translate bate o
+# motor de regex, sem qualquer análise de padrão.
+_SANITIZE_TABLE = str.maketrans('', '', '<>:"/\\|?*')
+
+# Dtype de texto com backend Arrow quando o pyarrow está instalado: ocupa uma
+# fração da memória do dtype object e executa as operações .str em C.
+try:
+    import pyarrow  # noqa: F401
+    _TEXT_DTYPE = 'string[pyarrow]'
+except ImportError:
+    _TEXT_DTYPE = object
+
+# Leitor de .xlsx em Rust, 5-20× mais rápido do que o openpyxl; opcional, com
+# fallback para o modo streaming do openpyxl quando não está instalado.
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+def is_windows_abs_path(path):
+    """
+    Valida de forma mais robusta se um caminho é absoluto no Windows,
+    verificando por letras de unidade (C:\) ou caminhos de rede UNC (\\servidor).
+    Esta função é mais fiável em ambientes de servidor.
+    """
+    path = path.strip('"') # Remove aspas que podem vir do 'copiar como caminho'
+    if _RE_LETRA_UNIDADE.match(path):
+        return True
+    if path.startswith('\\\\'):
+        return True
+    return False
+
+MAPPING_KEYWORDS = {
+    'data_inicio': ['data início', 'datainicio', 'data_inicio', 'start date', 'inicio', 'começo'],
+    'data_fim': ['data fim', 'datafim', 'data_fim', 'end date', 'fim', 'término', 'termino'],
+    'condutor': ['condutor', 'motorista', 'driver', 'nome', 'operador'],
+    'cpf': ['cpf'],
+    'maquina': ['maquina', 'máquina', 'equipamento', 'equipment', 'veiculo', 'viatura']
+}
+
+# Um único padrão alternado compilado por chave, construído uma vez no
+# arranque: cada nome de coluna é percorrido numa só passagem em C, em vez de
+# um scan de substring por palavra-chave — a variante leve do multi-pattern
+# matching, sem arrastar uma dependência de autómato Aho-Corasick para meia
+# dúzia de padrões.
+_RE_KEYWORDS = {
+    map_key: re.compile('|'.join(re.escape(_RE_NONALNUM.sub('', keyword.lower()))
+                                 for keyword in keywords))
+    for map_key, keywords in MAPPING_KEYWORDS.items()
+}
+
+def guess_mappings(columns):
+    """
+    Tenta adivinhar o mapeamento das colunas com base em nomes e palavras-chave comuns.
+    Retorna um dicionário com os nomes das colunas adivinhadas.
+    """
+    guessed_map = {}
+    normalized_columns = {col: _RE_NONALNUM.sub('', col.lower()) for col in columns}
+
+    for map_key, padrao in _RE_KEYWORDS.items():
+        for col, normalized_col in normalized_columns.items():
+            if padrao.search(normalized_col):
+                guessed_map[map_key] = col
+                # Cada coluna só pode mapear para uma chave; retirá-la evita
+                # que seja re-testada pelas chaves seguintes.
+                del normalized_columns[col]
+                break
+        if len(guessed_map) == len(_RE_KEYWORDS):
+            break
+
+    return guessed_map
+
+# Formatos de data/hora habituais nas planilhas exportadas; detectar um destes
+# na primeira célula activa o caminho C do pandas em vez do parser genérico do
+# dateutil, que é ordens de grandeza mais lento por célula.
+_FORMATOS_DATA = (
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+    '%d-%m-%Y %H:%M:%S', '%d-%m-%Y %H:%M', '%d-%m-%Y',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d',
+)
+
+def _parse_datas(serie):
+    """
+    Converte uma coluna inteira para datetime de uma só vez. Se o openpyxl já
+    entregou a coluna como datetime64 (datas seriais do Excel), evita o re-parse;
+    para colunas de texto, sonda a primeira célula contra os formatos habituais
+    e usa um formato explícito quando um deles cobre a coluna toda. cache=True
+    memoiza timestamps repetidos dentro da mesma coluna.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    preenchidas = serie.dropna()
+    if not preenchidas.empty and isinstance(preenchidas.iloc[0], str):
+        primeira = preenchidas.iloc[0].strip()
+        for formato in _FORMATOS_DATA:
+            try:
+                datetime.strptime(primeira, formato)
+            except ValueError:
+                continue
+            convertidas = pd.to_datetime(serie, format=formato, errors='coerce', cache=True)
+            if int(convertidas.notna().sum()) == len(preenchidas):
+                return convertidas
+            # O formato da primeira célula não serve para a coluna inteira;
+            # cai no parser genérico para não inventar erros novos.
+            break
+
+    # format='mixed' força a inferência célula a célula: sem ele, o pandas
+    # deduz o formato a partir da primeira célula e coage para NaT todas as
+    # linhas que não o sigam, descartando datas válidas em colunas mistas.
+    return pd.to_datetime(serie, format='mixed', dayfirst=True, errors='coerce', cache=True)
+
+def _compilar_template(template):
+    """
+    Analisa o modelo uma única vez numa lista de tuplos (literal, campo),
+    evitando que str.format re-interprete a string do modelo para cada linha.
+    Especificadores de formato ({DATA:>20}) e conversões ({DATA!r}) não são
+    suportados pelo montador vetorizado e são rejeitados com ValueError, em
+    vez de serem descartados em silêncio e mudarem os nomes gerados.
+    """
+    tokens = []
+    for literal, campo, spec, conv in string.Formatter().parse(template):
+        if spec or conv:
+            raise ValueError(
+                f"especificadores de formato ou conversões não são suportados no campo {campo!r}")
+        tokens.append((literal, campo))
+    return tokens
+
+_CAMPOS_MODELO = ('DATA', 'HORA_INICIO', 'HORA_FIM', 'CONDUTOR', 'CPF', 'MAQUINA')
+
+TEMPLATES_SUGERIDOS = {
+    "Padrão (Underline)": "{DATA}_{CONDUTOR}_{CPF}_{MAQUINA}",
+    "Completo (Underline)": "{DATA}_{HORA_INICIO}_{HORA_FIM}_{CONDUTOR}_{CPF}_{MAQUINA}",
+    "Padrão (Hífen)": "{DATA}-{CONDUTOR}-{CPF}-{MAQUINA}",
+    "Completo (Hífen)": "{DATA}-{HORA_INICIO}-{HORA_FIM}-{CONDUTOR}-{CPF}-{MAQUINA}",
+    "Apenas Data e Condutor": "{DATA}_{CONDUTOR}",
+}
+
+# Montadores especializados para os modelos sugeridos — o caso comum. Cada um é
+# uma cadeia fixa de concatenações de Series em C, sem iterar a lista de tokens.
+_MONTADORES_ESPECIALIZADOS = {
+    "{DATA}_{CONDUTOR}_{CPF}_{MAQUINA}":
+        lambda p: p['DATA'] + '_' + p['CONDUTOR'] + '_' + p['CPF'] + '_' + p['MAQUINA'],
+    "{DATA}_{HORA_INICIO}_{HORA_FIM}_{CONDUTOR}_{CPF}_{MAQUINA}":
+        lambda p: (p['DATA'] + '_' + p['HORA_INICIO'] + '_' + p['HORA_FIM'] + '_'
+                   + p['CONDUTOR'] + '_' + p['CPF'] + '_' + p['MAQUINA']),
+    "{DATA}-{CONDUTOR}-{CPF}-{MAQUINA}":
+        lambda p: p['DATA'] + '-' + p['CONDUTOR'] + '-' + p['CPF'] + '-' + p['MAQUINA'],
+    "{DATA}-{HORA_INICIO}-{HORA_FIM}-{CONDUTOR}-{CPF}-{MAQUINA}":
+        lambda p: (p['DATA'] + '-' + p['HORA_INICIO'] + '-' + p['HORA_FIM'] + '-'
+                   + p['CONDUTOR'] + '-' + p['CPF'] + '-' + p['MAQUINA']),
+    "{DATA}_{CONDUTOR}":
+        lambda p: p['DATA'] + '_' + p['CONDUTOR'],
+}
+
+def _transformar_unicos(serie, transformar):
+    """
+    Aplica a transformação apenas aos valores distintos da coluna e propaga o
+    resultado por map — nas planilhas reais o mesmo condutor/CPF/máquina
+    repete-se em muitas linhas, por isso cada valor distinto paga a limpeza
+    uma única vez.
+    """
+    unicos = serie.drop_duplicates()
+    if len(unicos) == len(serie):
+        return transformar(serie)
+    mapa = dict(zip(unicos.tolist(), transformar(unicos).tolist()))
+    return serie.map(mapa).astype(_TEXT_DTYPE)
+
+@functools.lru_cache(maxsize=128)
+def _montador_para(template):
+    """
+    Especializa o modelo em código: gera, uma única vez por modelo, uma função
+    que monta os nomes como uma cadeia fixa de concatenações de Series — sem
+    voltar a percorrer a lista de tokens em cada execução. Os modelos sugeridos
+    usam os montadores pré-construídos; um modelo sem nenhum campo devolve None
+    e fica com o caminho genérico do chamador. Só deve ser chamado com modelos
+    já validados por processar_dados.
+    """
+    montador = _MONTADORES_ESPECIALIZADOS.get(template)
+    if montador is not None:
+        return montador
+
+    tokens = _compilar_template(template)
+    if not any(campo is not None for _, campo in tokens):
+        return None
+
+    segmentos = []
+    for literal, campo in tokens:
+        if literal:
+            segmentos.append(repr(literal))
+        if campo is not None:
+            segmentos.append(f"p[{campo!r}]")
+    # Os segmentos são apenas literais repr() e acessos p['CAMPO'] com campos
+    # validados, por isso o eval é seguro.
+    return eval('lambda p: ' + ' + '.join(segmentos))
+
+def processar_dados(df, mapeamento, template):
+    """
+    Processa o DataFrame para gerar os nomes das pastas e retorna uma lista de tuplos
+    contendo (nome_final, objeto_datetime_inicio).
+
+    O processamento é feito coluna a coluna (vetorizado) em vez de linha a linha,
+    evitando o custo do interpretador Python por célula em planilhas grandes.
+    Apenas os campos realmente referidos no modelo são formatados; o strftime é
+    a parte mais cara que resta, por isso não vale a pena pagá-lo para campos
+    que o utilizador não usa.
+    """
+    try:
+        tokens = _compilar_template(template)
+    except ValueError as e:
+        return [], [f"Erro ao aplicar o modelo do nome: {e}"]
+
+    campos_desconhecidos = sorted({campo for _, campo in tokens
+                                   if campo is not None and campo not in _CAMPOS_MODELO})
+    if campos_desconhecidos:
+        return [], [f"Erro ao aplicar o modelo do nome: variáveis desconhecidas: "
+                    f"{', '.join(repr(c) for c in campos_desconhecidos)}"]
+
+    campos_usados = {campo for _, campo in tokens if campo is not None}
+
+    serie_vazia = pd.Series('', index=df.index, dtype=_TEXT_DTYPE)
+    partes_nome = {campo: serie_vazia for campo in _CAMPOS_MODELO}
+    dt_inicio_serie = None
+    linhas_validas = pd.Series(True, index=df.index)
+
+    if mapeamento['data_inicio'] != "N/A":
+        dt_inicio_serie = _parse_datas(df[mapeamento['data_inicio']])
+        linhas_validas &= dt_inicio_serie.notna()
+        if 'DATA' in campos_usados:
+            partes_nome['DATA'] = dt_inicio_serie.dt.strftime('%d-%m-%Y').astype(_TEXT_DTYPE)
+        if 'HORA_INICIO' in campos_usados:
+            partes_nome['HORA_INICIO'] = dt_inicio_serie.dt.strftime('%H-%M-%S').astype(_TEXT_DTYPE)
+
+    if mapeamento['data_fim'] != "N/A":
+        dt_fim_serie = _parse_datas(df[mapeamento['data_fim']])
+        linhas_validas &= dt_fim_serie.notna()
+        if 'HORA_FIM' in campos_usados:
+            partes_nome['HORA_FIM'] = dt_fim_serie.dt.strftime('%H-%M-%S').astype(_TEXT_DTYPE)
+
+    if mapeamento['condutor'] != "N/A" and 'CONDUTOR' in campos_usados:
+        partes_nome['CONDUTOR'] = _transformar_unicos(
+            df[mapeamento['condutor']].astype(str),
+            lambda s: s.astype(_TEXT_DTYPE).str.strip().str.replace(' ', '-', regex=False))
+
+    if mapeamento['cpf'] != "N/A" and 'CPF' in campos_usados:
+        partes_nome['CPF'] = _transformar_unicos(
+            df[mapeamento['cpf']].astype(str),
+            lambda s: s.astype(_TEXT_DTYPE).str.split('.', n=1).str[0])
+
+    if mapeamento['maquina'] != "N/A" and 'MAQUINA' in campos_usados:
+        partes_nome['MAQUINA'] = _transformar_unicos(
+            df[mapeamento['maquina']].astype(str),
+            lambda s: s.astype(_TEXT_DTYPE).str.strip())
+
+    erros = [f"Erro na linha {indice + 2} da planilha: data inválida ou em falta."
+             for indice in df.index[~linhas_validas]]
+
+    partes_validas = {campo: serie[linhas_validas] for campo, serie in partes_nome.items()}
+    montador = _montador_para(template)
+    if montador is not None:
+        nomes_serie = montador(partes_validas)
+    else:
+        # Modelo só com literais: monta a Series constante diretamente.
+        nomes_serie = pd.Series('', index=df.index[linhas_validas], dtype=_TEXT_DTYPE)
+        for literal, _campo in tokens:
+            if literal:
+                nomes_serie = nomes_serie + literal
+
+    # Remove já aqui os caracteres proibidos em nomes de pasta no Windows, para
+    # que a lista descarregada em .txt também seja utilizável tal e qual.
+    nomes_serie = nomes_serie.str.translate(_SANITIZE_TABLE)
+    nomes_serie = nomes_serie.str.replace(_RE_DUP_SEP, r'\1', regex=True)
+    nomes_serie = nomes_serie.str.strip('_- ')
+
+    if dt_inicio_serie is not None:
+        datas_inicio = list(dt_inicio_serie[linhas_validas])
+    else:
+        datas_inicio = [None] * len(nomes_serie)
+
+    items_gerados = list(zip(nomes_serie.tolist(), datas_inicio))
+    return items_gerados, erros
+
+def _montar_dataframe(headers, rows, usecols, nrows):
+    """
+    Constrói o DataFrame a partir do cabeçalho e de um iterável de linhas.
+    `usecols` restringe a leitura a um conjunto de nomes de coluna e `nrows`
+    limita o número de linhas de dados, para que a pré-visualização e o
+    processamento só materializem as células necessárias.
+    """
+    if nrows is not None:
+        rows = itertools.islice(rows, nrows)
+    if usecols is None:
+        indices = list(range(len(headers)))
+    else:
+        usecols = set(usecols)
+        indices = [i for i, h in enumerate(headers) if h in usecols]
+    colunas = list(zip(*([linha[i] if i < len(linha) else None for i in indices]
+                         for linha in rows)))
+    if not colunas:
+        colunas = [()] * len(indices)
+    return pd.DataFrame({headers[i]: list(col) for i, col in zip(indices, colunas)})
+
+def _read_xlsx_fast(buf, usecols=None, nrows=None):
+    """
+    Lê um .xlsx com o python-calamine quando disponível, ou com o modo streaming
+    (read_only) do openpyxl — ambos evitam o modo DOM completo do pd.read_excel,
+    que é muito mais lento e mantém a árvore XML inteira em memória.
+    """
+    if CalamineWorkbook is not None:
+        linhas = CalamineWorkbook.from_filelike(buf).get_sheet_by_index(0).to_python()
+        if not linhas:
+            return pd.DataFrame()
+        headers = [str(col).strip() for col in linhas[0]]
+        return _montar_dataframe(headers, iter(linhas[1:]), usecols, nrows)
+
+    wb = openpyxl.load_workbook(buf, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(values_only=True)
+        try:
+            headers = [str(col).strip() for col in next(rows)]
+        except StopIteration:
+            return pd.DataFrame()
+        return _montar_dataframe(headers, rows, usecols, nrows)
+    finally:
+        wb.close()